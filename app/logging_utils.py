@@ -1,28 +1,43 @@
 from __future__ import annotations
 
-import json
 import logging
-from datetime import datetime, timezone
+import sys
+import time
+from typing import BinaryIO, Optional
+
+import orjson
+
+LEVEL_NAMES = {40: "ERROR", 30: "WARNING", 20: "INFO", 10: "DEBUG"}
 
 
 def utc_now_iso() -> str:
-    # ISO-8601 UTC with Z
-    return datetime.now(timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    # ISO-8601 UTC with Z, second precision
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+class JsonLogger:
+    # Writes one JSON line per record straight to the stream; skips the logging
+    # module's record/handler machinery since payloads are already structured.
 
+    def __init__(self, level: int, stream: Optional[BinaryIO] = None) -> None:
+        self.level = level
+        self.stream = stream if stream is not None else sys.stdout.buffer
 
-def build_logger(name: str, level: str) -> logging.Logger:
-    logger = logging.getLogger(name)
-    logger.setLevel(level.upper())
-    logger.propagate = False
+    def log(self, level: int, payload: dict) -> None:
+        if level < self.level:
+            return
+        self.stream.write(orjson.dumps(payload, option=orjson.OPT_APPEND_NEWLINE))
+        # flush per line so records are not held back (or lost) in the buffer
+        self.stream.flush()
 
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        handler.setFormatter(logging.Formatter("%(message)s"))  # we log pre-serialized JSON
-        logger.addHandler(handler)
 
-    return logger
+def build_logger(level: str, stream: Optional[BinaryIO] = None) -> JsonLogger:
+    levelno = logging.getLevelName(level.upper())  # int for known names, "Level X" otherwise
+    if not isinstance(levelno, int):
+        raise ValueError(f"Unknown level: {level!r}")
+    return JsonLogger(levelno, stream)
 
 
-def log_json(logger: logging.Logger, level: int, payload: dict) -> None:
+def log_json(logger: JsonLogger, level: int, payload: dict) -> None:
     # single-line JSON
-    logger.log(level, json.dumps(payload, separators=(",", ":"), ensure_ascii=False))
\ No newline at end of file
+    logger.log(level, payload)
@@ -2,35 +2,75 @@ from __future__ import annotations
 
 import hmac
 import hashlib
-import json
+import itertools
+import os
+import re
 import time
-import uuid
+
+import msgspec
+import orjson
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Annotated, Any, Optional
 
 from fastapi import FastAPI, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, PlainTextResponse
-from pydantic import BaseModel, Field, field_validator
+from fastapi.responses import ORJSONResponse, PlainTextResponse, Response
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 from .config import Settings
-from .logging_utils import build_logger, log_json, utc_now_iso
-from .metrics import HTTP_REQUESTS_TOTAL, REQUEST_LATENCY_MS, WEBHOOK_REQUESTS_TOTAL
-from .storage import connect, init_db, db_is_ready, insert_message, list_messages, compute_stats
+from .logging_utils import LEVEL_NAMES, JsonLogger, build_logger, log_json, utc_now_iso
+from .metrics import REQUEST_LATENCY_MS, WEBHOOK_RESULT_COUNTERS, get_http_counter
+from .storage import (
+    InsertQueue,
+    close_db,
+    compute_stats,
+    connect,
+    db_is_ready,
+    init_db,
+    init_fts,
+    insert_message,
+    list_messages,
+)
+
+
+# ---------- Models ----------
 
+# E.164: "+" followed by at most 15 digits
+E164_MAX_LEN = 16
 
-# ---------- Pydantic models ----------
 
-E164_RE = r"^\+\d+$"
+def _is_e164(s: str) -> bool:
+    digits = s[1:]
+    return s.startswith("+") and len(s) <= E164_MAX_LEN and digits.isascii() and digits.isdigit()
 
 
 def _parse_ts_z(ts: str) -> str:
     # Must end with Z and be valid UTC timestamp. Store as canonical "...Z" without micros.
     if not isinstance(ts, str) or not ts.endswith("Z"):
         raise ValueError("ts must be ISO-8601 UTC with Z suffix (e.g. 2025-01-15T10:00:00Z)")
+
+    # Fast path: already "YYYY-MM-DDTHH:MM:SSZ"; only the field values need checking.
+    if (
+        len(ts) == 20
+        and ts[4] == "-"
+        and ts[7] == "-"
+        and ts[10] == "T"
+        and ts[13] == ":"
+        and ts[16] == ":"
+    ):
+        try:
+            datetime.fromisoformat(ts[:19])
+        except ValueError as e:
+            raise ValueError("ts must be a valid ISO-8601 timestamp") from e
+        return ts
+
     try:
         dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
     except Exception as e:
@@ -40,97 +80,253 @@ def _parse_ts_z(ts: str) -> str:
     return dt.isoformat().replace("+00:00", "Z")
 
 
-class WebhookIn(BaseModel):
-    message_id: str = Field(min_length=1)
-    from_msisdn: str = Field(alias="from", pattern=E164_RE)
-    to_msisdn: str = Field(alias="to", pattern=E164_RE)
+class WebhookIn(msgspec.Struct, rename={"from_msisdn": "from", "to_msisdn": "to"}):
+    message_id: Annotated[str, msgspec.Meta(min_length=1)]
+    from_msisdn: str
+    to_msisdn: str
     ts: str
-    text: Optional[str] = Field(default=None, max_length=4096)
+    text: Optional[Annotated[str, msgspec.Meta(max_length=4096)]] = None
 
-    @field_validator("ts")
-    @classmethod
-    def validate_ts(cls, v: str) -> str:
-        return _parse_ts_z(v)
 
+_decode_webhook_json = msgspec.json.Decoder(WebhookIn).decode
 
-class StatusOut(BaseModel):
-    status: str = "ok"
+# Inlined JSON schema for the OpenAPI docs (msgspec.json.schema() would emit a
+# "#/$defs/..." ref that does not resolve inside the OpenAPI document).
+WEBHOOK_IN_SCHEMA = msgspec.json.schema_components([WebhookIn])[1]["WebhookIn"]
 
 
-# ---------- App factory ----------
+# msgspec reports "<msg> - at `$.field`" (path omitted at the top level)
+_MSGSPEC_PATH_RE = re.compile(r" - at `\$([^`]*)`$")
+_MSGSPEC_MISSING_RE = re.compile(r"^Object missing required field `([^`]*)`")
 
-def create_app(settings: Settings | None = None) -> FastAPI:
-    settings = settings or Settings()
-    logger = build_logger("api", settings.log_level)
 
-    @asynccontextmanager
-    async def lifespan(app: FastAPI):
-        # Hard fail if secret missing (matches requirement)
-        if not settings.webhook_secret:
-            raise RuntimeError("WEBHOOK_SECRET must be set and non-empty")
+def _msgspec_error(e: msgspec.DecodeError, body: Any) -> dict[str, Any]:
+    # Map a msgspec error onto a FastAPI-style entry with a field `loc`.
+    msg = str(e)
+    if not isinstance(e, msgspec.ValidationError):
+        return {"type": "json_invalid", "loc": ("body",), "msg": msg, "input": body}
 
-        conn = await connect(settings.sqlite_path)
-        await init_db(conn)
+    loc: list[Any] = ["body"]
+    m = _MSGSPEC_PATH_RE.search(msg)
+    if m:
+        msg = msg[: m.start()]
+        for key, index in re.findall(r"\.([^.\[]+)|\[(\d+)\]", m.group(1)):
+            loc.append(key if key else int(index))
 
-        app.state.settings = settings
-        app.state.db = conn
-        app.state.logger = logger
-        yield
+    m = _MSGSPEC_MISSING_RE.match(msg)
+    if m:
+        return {"type": "missing", "loc": (*loc, m.group(1)), "msg": "Field required", "input": body}
+    return {"type": "value_error", "loc": tuple(loc), "msg": msg, "input": body}
+
+
+def _field_error(field: str, msg: str, value: Any) -> dict[str, Any]:
+    return {"type": "value_error", "loc": ("body", field), "msg": msg, "input": value}
+
+
+def _error_body(raw: bytes) -> Any:
+    # Best-effort body for error reporting; orjson rejects some input msgspec accepts
+    # (e.g. 1e999 in an ignored field), so never let this raise.
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def decode_webhook(raw: bytes) -> WebhookIn:
+    """Decode + validate a webhook body; errors become a regular 422 with per-field locs."""
+    try:
+        payload = _decode_webhook_json(raw)
+    except msgspec.DecodeError as e:
+        body = _error_body(raw)
+        raise RequestValidationError([_msgspec_error(e, body)], body=body) from e
+
+    # checks msgspec can't express; collect them all, one entry per field
+    errors = []
+    if not _is_e164(payload.from_msisdn):
+        errors.append(_field_error("from", "must be an E.164 number (e.g. +14155550100)", payload.from_msisdn))
+    if not _is_e164(payload.to_msisdn):
+        errors.append(_field_error("to", "must be an E.164 number (e.g. +14155550100)", payload.to_msisdn))
+    try:
+        payload.ts = _parse_ts_z(payload.ts)
+    except ValueError as e:
+        errors.append(_field_error("ts", str(e), payload.ts))
+
+    if errors:
+        raise RequestValidationError(errors, body=_error_body(raw))
+    return payload
+
+
+# Fixed bodies of the hot endpoints, served without model dump / JSON encode.
+_OK_BODY = b'{"status":"ok"}'
+_LIVE_BODY = b'{"status":"live"}'
+_READY_BODY = b'{"status":"ready"}'
+
+
+# ---------- Middleware (pure ASGI) ----------
+
+_PID = os.getpid()
+_REQUEST_COUNTER = itertools.count()
+_MAX_REQUEST_ID_LEN = 128
+
+
+def _request_id(scope: Scope) -> bytes:
+    # Honor a caller-supplied X-Request-ID, otherwise mint "<pid>-<counter>" (hex).
+    for name, value in scope["headers"]:
+        if name == b"x-request-id":
+            if 0 < len(value) <= _MAX_REQUEST_ID_LEN:
+                return value
+            break
+    return f"{_PID:x}-{next(_REQUEST_COUNTER):x}".encode("latin-1")
+
+
+# Worst case for a valid body: 4096 text chars escaped as \uXXXX\uXXXX surrogate
+# pairs (12 bytes each, ~48KB) plus the other fields.
+MAX_WEBHOOK_BODY_BYTES = 64 * 1024
 
-        await conn.close()
 
-    app = FastAPI(lifespan=lifespan)
+def _static_json(body: bytes) -> tuple[bytes, list[tuple[bytes, bytes]]]:
+    return body, [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode("latin-1")),
+    ]
 
-    # ---------- Middleware: signature verification for /webhook ----------
-    @app.middleware("http")
-    async def webhook_signature_middleware(request: Request, call_next):
-        if request.method == "POST" and request.url.path == "/webhook":
-            secret = request.app.state.settings.webhook_secret.encode("utf-8")
-            raw = await request.body()
 
-            sig = request.headers.get("X-Signature")
-            expected = hmac.new(secret, raw, hashlib.sha256).hexdigest()
+# Byte-identical on every rejection, so encoded once.
+_INVALID_SIG_BODY, _INVALID_SIG_HEADERS = _static_json(b'{"detail":"invalid signature"}')
+_TOO_LARGE_BODY, _TOO_LARGE_HEADERS = _static_json(b'{"detail":"payload too large"}')
 
-            if not sig or not hmac.compare_digest(sig.lower(), expected.lower()):
-                # Put info into request.state for logging/metrics
-                request.state.webhook_result = "invalid_signature"
-                request.state.webhook_dup = False
-                try:
-                    body_json = json.loads(raw.decode("utf-8"))
-                    request.state.webhook_message_id = body_json.get("message_id")
-                except Exception:
-                    request.state.webhook_message_id = None
 
-                return JSONResponse(status_code=401, content={"detail": "invalid signature"})
+def _scope_state(scope: Scope) -> dict:
+    # Same dict that Starlette's `request.state` reads/writes.
+    return scope.setdefault("state", {})
 
-        return await call_next(request)
 
-    # ---------- Middleware: request_id + logging + metrics ----------
-    @app.middleware("http")
-    async def observability_middleware(request: Request, call_next):
-        request_id = str(uuid.uuid4())
-        request.state.request_id = request_id
+class SignatureMiddleware:
+    """Verify X-Signature (HMAC-SHA256 of the raw body) on POST /webhook."""
+
+    def __init__(self, app: ASGIApp, secret: bytes) -> None:
+        self.app = app
+        # Keyed once; copying it per request skips re-deriving the ipad/opad state.
+        self._mac_template = hmac.new(secret, digestmod=hashlib.sha256)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != "/webhook":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+
+        # Bound the hashing work: refuse a declared oversized body before reading it...
+        content_length = headers.get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > MAX_WEBHOOK_BODY_BYTES:
+            await self._too_large(scope, send)
+            return
+
+        # Hash each chunk as it arrives while collecting the body for replay,
+        # so the body is only walked once.
+        mac = self._mac_template.copy()
+        buf = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                # client disconnected before the body was complete
+                return
+            chunk = message.get("body", b"")
+            # ...and stop streaming one without (or lying about) Content-Length.
+            if len(buf) + len(chunk) > MAX_WEBHOOK_BODY_BYTES:
+                await self._too_large(scope, send)
+                return
+            mac.update(chunk)
+            buf += chunk
+            more_body = message.get("more_body", False)
+        raw = bytes(buf)
+
+        sig = headers.get("X-Signature")
+        expected = mac.hexdigest()
+
+        if not sig or not hmac.compare_digest(sig.lower(), expected.lower()):
+            # Put info into request.state for logging/metrics
+            state = _scope_state(scope)
+            state["webhook_result"] = "invalid_signature"
+            state["webhook_dup"] = False
+            try:
+                body_json = orjson.loads(raw)
+                state["webhook_message_id"] = body_json.get("message_id")
+            except Exception:
+                state["webhook_message_id"] = None
+
+            await send({"type": "http.response.start", "status": 401, "headers": _INVALID_SIG_HEADERS})
+            await send({"type": "http.response.body", "body": _INVALID_SIG_BODY})
+            return
+
+        # Replay the buffered body to the downstream app.
+        replayed = False
+
+        async def replay_receive() -> Message:
+            nonlocal replayed
+            if not replayed:
+                replayed = True
+                return {"type": "http.request", "body": raw, "more_body": False}
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    @staticmethod
+    async def _too_large(scope: Scope, send: Send) -> None:
+        state = _scope_state(scope)
+        state["webhook_result"] = "payload_too_large"
+        state["webhook_dup"] = False
+        state["webhook_message_id"] = None
+        await send({"type": "http.response.start", "status": 413, "headers": _TOO_LARGE_HEADERS})
+        await send({"type": "http.response.body", "body": _TOO_LARGE_BODY})
+
+
+class ObservabilityMiddleware:
+    """Assign a request id, emit the JSON access log and record metrics."""
+
+    def __init__(self, app: ASGIApp, logger: JsonLogger) -> None:
+        self.app = app
+        self.logger = logger
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw_request_id = _request_id(scope)
+        request_id = raw_request_id.decode("latin-1")
+        state = _scope_state(scope)
+        state["request_id"] = request_id
+        request_id_header = (b"x-request-id", raw_request_id)
         start = time.perf_counter()
 
         status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [request_id_header]
+            await send(message)
+
         try:
-            response = await call_next(request)
-            status_code = response.status_code
+            await self.app(scope, receive, send_wrapper)
         except Exception:
             # unhandled exception path
             status_code = 500
             raise
         finally:
             latency_ms = (time.perf_counter() - start) * 1000.0
-            path = request.url.path
+            path = scope["path"]
 
             # metrics
-            HTTP_REQUESTS_TOTAL.labels(path=path, status=str(status_code)).inc()
+            get_http_counter(path, status_code).inc()
             REQUEST_LATENCY_MS.observe(latency_ms)
 
-            result = getattr(request.state, "webhook_result", None)
+            result = state.get("webhook_result")
             if path == "/webhook" and result:
-                WEBHOOK_REQUESTS_TOTAL.labels(result=result).inc()
+                WEBHOOK_RESULT_COUNTERS[result].inc()
 
             # log level
             if path == "/webhook" and result == "invalid_signature":
@@ -142,38 +338,66 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             else:
                 level = 20  # INFO
 
-            log_payload = {
-                "ts": utc_now_iso(),
-                "level": logging_level_name(level),
-                "request_id": request_id,
-                "method": request.method,
-                "path": path,
-                "status": status_code,
-                "latency_ms": round(latency_ms, 2),
-            }
+            if level >= self.logger.level:
+                log_payload = {
+                    "ts": utc_now_iso(),
+                    "level": LEVEL_NAMES[level],
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": path,
+                    "status": status_code,
+                    "latency_ms": round(latency_ms, 2),
+                }
+
+                if path == "/webhook":
+                    log_payload.update(
+                        {
+                            "message_id": state.get("webhook_message_id"),
+                            "dup": state.get("webhook_dup"),
+                            "result": result,
+                        }
+                    )
+
+                log_json(self.logger, level, log_payload)
+
+
+# ---------- App factory ----------
 
-            if path == "/webhook":
-                log_payload.update(
-                    {
-                        "message_id": getattr(request.state, "webhook_message_id", None),
-                        "dup": getattr(request.state, "webhook_dup", None),
-                        "result": getattr(request.state, "webhook_result", None),
-                    }
-                )
-
-            log_json(request.app.state.logger, level, log_payload)
-
-        response.headers["X-Request-ID"] = request_id
-        return response
-
-    def logging_level_name(level: int) -> str:
-        if level >= 40:
-            return "ERROR"
-        if level >= 30:
-            return "WARNING"
-        if level >= 20:
-            return "INFO"
-        return "DEBUG"
+def create_app(settings: Settings | None = None) -> FastAPI:
+    settings = settings or Settings()
+    logger = build_logger(settings.log_level)
+    secret_bytes = settings.webhook_secret.encode("utf-8")
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Hard fail if secret missing (matches requirement)
+        if not settings.webhook_secret:
+            raise RuntimeError("WEBHOOK_SECRET must be set and non-empty")
+
+        conn = await connect(settings.sqlite_path)
+        await init_db(conn)
+        fts_enabled = await init_fts(conn)
+        writer = InsertQueue(conn)
+        writer.start()
+
+        app.state.db = conn
+        app.state.writer = writer
+        app.state.fts_enabled = fts_enabled
+        app.state.logger = logger
+        yield
+
+        await writer.stop()
+        await close_db(conn)
+
+    # Outermost first: observability wraps compression, which wraps signature verification.
+    middleware = [
+        Middleware(ObservabilityMiddleware, logger=logger),
+        Middleware(GZipMiddleware, minimum_size=1024),
+        Middleware(SignatureMiddleware, secret=secret_bytes),
+    ]
+
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse, middleware=middleware)
+    app.state.settings = settings
 
     # ---------- Exception handler: mark webhook validation errors for metrics/logs ----------
     @app.exception_handler(RequestValidationError)
@@ -187,13 +411,13 @@ def create_app(settings: Settings | None = None) -> FastAPI:
                     request.state.webhook_message_id = exc.body.get("message_id")
             except Exception:
                 pass
-        return JSONResponse(status_code=422, content={"detail": exc.errors()})
+        return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors())})
 
     # ---------- Routes ----------
 
     @app.get("/health/live")
     async def health_live():
-        return {"status": "live"}
+        return Response(content=_LIVE_BODY, media_type="application/json")
 
     @app.get("/health/ready")
     async def health_ready(request: Request):
@@ -201,22 +425,31 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         conn = request.app.state.db
 
         if not settings.webhook_secret:
-            return JSONResponse(status_code=503, content={"status": "not_ready", "reason": "missing WEBHOOK_SECRET"})
+            return ORJSONResponse(status_code=503, content={"status": "not_ready", "reason": "missing WEBHOOK_SECRET"})
 
         ok = await db_is_ready(conn)
         if not ok:
-            return JSONResponse(status_code=503, content={"status": "not_ready", "reason": "db not ready"})
+            return ORJSONResponse(status_code=503, content={"status": "not_ready", "reason": "db not ready"})
 
-        return {"status": "ready"}
+        return Response(content=_READY_BODY, media_type="application/json")
 
-    @app.post("/webhook", response_model=StatusOut)
-    async def webhook(request: Request, payload: WebhookIn):
+    @app.post(
+        "/webhook",
+        # the body is decoded by msgspec in the handler, so describe it for the docs here
+        openapi_extra={
+            "requestBody": {
+                "content": {"application/json": {"schema": WEBHOOK_IN_SCHEMA}},
+                "required": True,
+            }
+        },
+        responses={200: {"content": {"application/json": {"example": {"status": "ok"}}}}},
+    )
+    async def webhook(request: Request):
         # signature already verified in middleware if we got here
+        payload = decode_webhook(await request.body())
         created_at = utc_now_iso()
-        conn = request.app.state.db
-
         created = await insert_message(
-            conn,
+            request.app.state.writer,
             message_id=payload.message_id,
             from_msisdn=payload.from_msisdn,
             to_msisdn=payload.to_msisdn,
@@ -229,7 +462,7 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         request.state.webhook_dup = (not created)
         request.state.webhook_result = "created" if created else "duplicate"
 
-        return {"status": "ok"}
+        return Response(content=_OK_BODY, media_type="application/json")
 
     @app.get("/messages")
     async def get_messages(
@@ -251,6 +484,7 @@ def create_app(settings: Settings | None = None) -> FastAPI:
             from_filter=from_,
             since=since,
             q=q,
+            fts=request.app.state.fts_enabled,
         )
         return {"data": data, "total": total, "limit": limit, "offset": offset}
 
@@ -266,4 +500,18 @@ def create_app(settings: Settings | None = None) -> FastAPI:
     return app
 
 
-app = create_app()
\ No newline at end of file
+app = create_app()
+
+
+if __name__ == "__main__":
+    # `python -m app.main`: uvicorn's "auto" loop/http pick uvloop + httptools
+    # whenever they are installed (uvicorn[standard], except on Windows)
+    import uvicorn
+
+    uvicorn.run(
+        app,
+        # local dev server; the container binds 0.0.0.0 via its own CMD
+        host="127.0.0.1",
+        port=8000,
+        log_level=app.state.settings.log_level.lower(),
+    )
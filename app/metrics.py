@@ -16,4 +16,21 @@ REQUEST_LATENCY_MS = Histogram(
     "request_latency_ms",
     "Request latency in milliseconds",
     buckets=(25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf")),
-)
\ No newline at end of file
+)
+
+# Cached label children so the request path skips labels() lookups.
+_HTTP_COUNTERS = {}
+
+
+def get_http_counter(path: str, status: int):
+    child = _HTTP_COUNTERS.get((path, status))
+    if child is None:
+        child = HTTP_REQUESTS_TOTAL.labels(path=path, status=str(status))
+        _HTTP_COUNTERS[(path, status)] = child
+    return child
+
+
+WEBHOOK_RESULT_COUNTERS = {
+    result: WEBHOOK_REQUESTS_TOTAL.labels(result=result)
+    for result in ("created", "duplicate", "invalid_signature", "validation_error", "payload_too_large")
+}
@@ -7,4 +7,79 @@ CREATE TABLE IF NOT EXISTS messages (
   text TEXT,
   created_at TEXT NOT NULL
 );
-"""
\ No newline at end of file
+
+-- ORDER BY ts, message_id and the `since` range filter
+CREATE INDEX IF NOT EXISTS idx_messages_ts_id ON messages(ts, message_id);
+-- `from` filter (+ ordering) and per-sender stats; also serves lookups on from_msisdn alone
+CREATE INDEX IF NOT EXISTS idx_messages_from_ts ON messages(from_msisdn, ts, message_id);
+
+-- Single-row running totals for /stats, maintained by the triggers below.
+CREATE TABLE IF NOT EXISTS stats_summary (
+  id INTEGER PRIMARY KEY CHECK (id = 1),
+  total_messages INTEGER NOT NULL,
+  senders_count INTEGER NOT NULL,
+  first_ts TEXT,
+  last_ts TEXT
+);
+
+-- seed from existing rows the first time the summary table is created
+INSERT OR IGNORE INTO stats_summary(id, total_messages, senders_count, first_ts, last_ts)
+SELECT 1, COUNT(*), COUNT(DISTINCT from_msisdn), MIN(ts), MAX(ts)
+FROM messages
+WHERE NOT EXISTS (SELECT 1 FROM stats_summary);
+
+CREATE TRIGGER IF NOT EXISTS messages_stats_ai AFTER INSERT ON messages BEGIN
+  UPDATE stats_summary SET
+    total_messages = total_messages + 1,
+    senders_count = senders_count + NOT EXISTS (
+      SELECT 1 FROM messages WHERE from_msisdn = new.from_msisdn AND rowid <> new.rowid
+    ),
+    first_ts = CASE WHEN first_ts IS NULL OR new.ts < first_ts THEN new.ts ELSE first_ts END,
+    last_ts = CASE WHEN last_ts IS NULL OR new.ts > last_ts THEN new.ts ELSE last_ts END
+  WHERE id = 1;
+END;
+
+-- deletes/updates never happen on the API path; just recompute
+CREATE TRIGGER IF NOT EXISTS messages_stats_ad AFTER DELETE ON messages BEGIN
+  UPDATE stats_summary SET
+    total_messages = (SELECT COUNT(*) FROM messages),
+    senders_count = (SELECT COUNT(DISTINCT from_msisdn) FROM messages),
+    first_ts = (SELECT MIN(ts) FROM messages),
+    last_ts = (SELECT MAX(ts) FROM messages)
+  WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_stats_au AFTER UPDATE ON messages BEGIN
+  UPDATE stats_summary SET
+    total_messages = (SELECT COUNT(*) FROM messages),
+    senders_count = (SELECT COUNT(DISTINCT from_msisdn) FROM messages),
+    first_ts = (SELECT MIN(ts) FROM messages),
+    last_ts = (SELECT MAX(ts) FROM messages)
+  WHERE id = 1;
+END;
+"""
+
+# Optional: needs SQLite built with FTS5 (trigram tokenizer, 3.34+). External-content
+# table keyed by messages.rowid, kept in sync by triggers. The trigram tokenizer keeps
+# `q` a case-insensitive substring match (for queries of 3+ characters).
+FTS_SCHEMA_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+  text,
+  content='messages',
+  content_rowid='rowid',
+  tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+  INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+  INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE ON messages BEGIN
+  INSERT INTO messages_fts(messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+  INSERT INTO messages_fts(rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import sqlite3
+
 import aiosqlite
+import orjson
 from typing import Any, Optional
 
-from .models import SCHEMA_SQL
+from .models import FTS_SCHEMA_SQL, SCHEMA_SQL
 
 
 async def connect(db_path: str) -> aiosqlite.Connection:
@@ -12,6 +17,10 @@ async def connect(db_path: str) -> aiosqlite.Connection:
     # better concurrency for SQLite
     await conn.execute("PRAGMA journal_mode=WAL;")
     await conn.execute("PRAGMA synchronous=NORMAL;")
+    await conn.execute("PRAGMA wal_autocheckpoint=1000;")
+    # ~20MB page cache and memory-mapped reads for the listing/stats scans
+    await conn.execute("PRAGMA cache_size=-20000;")
+    await conn.execute("PRAGMA mmap_size=268435456;")
     return conn
 
 
@@ -20,6 +29,31 @@ async def init_db(conn: aiosqlite.Connection) -> None:
     await conn.commit()
 
 
+async def close_db(conn: aiosqlite.Connection) -> None:
+    # refresh planner statistics only where they are stale, then close
+    await conn.execute("PRAGMA optimize;")
+    await conn.close()
+
+
+async def init_fts(conn: aiosqlite.Connection) -> bool:
+    """
+    Create the full-text index for the `q` filter. Returns False when this SQLite
+    build lacks FTS5/trigram, in which case list_messages keeps the LIKE scan.
+    """
+    cur = await conn.execute("SELECT 1 FROM sqlite_master WHERE name='messages_fts';")
+    existed = await cur.fetchone() is not None
+    try:
+        await conn.executescript(FTS_SCHEMA_SQL)
+    except sqlite3.OperationalError:
+        return False
+
+    if not existed:
+        # index rows that were stored before the FTS table existed
+        await conn.execute("INSERT INTO messages_fts(messages_fts) VALUES('rebuild');")
+    await conn.commit()
+    return True
+
+
 async def db_is_ready(conn: aiosqlite.Connection) -> bool:
     try:
         await conn.execute("SELECT 1;")
@@ -32,8 +66,99 @@ async def db_is_ready(conn: aiosqlite.Connection) -> bool:
         return False
 
 
+INSERT_MESSAGE_SQL = """
+INSERT OR IGNORE INTO messages(message_id, from_msisdn, to_msisdn, ts, text, created_at)
+VALUES(?,?,?,?,?,?)
+"""
+
+# One fixed statement for any batch size (ids passed as a JSON array), so it stays
+# in sqlite3's statement cache instead of evicting the listing queries.
+EXISTING_IDS_SQL = "SELECT message_id FROM messages WHERE message_id IN (SELECT value FROM json_each(?))"
+
+
+class InsertQueue:
+    """
+    Single writer for `messages`. Concurrent inserts are queued and coalesced by
+    one background task into a single executemany + commit per batch.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, max_batch: int = 256) -> None:
+        self.conn = conn
+        self.max_batch = max_batch
+        self._queue: asyncio.Queue[tuple[tuple[Any, ...], asyncio.Future[bool]]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._drain())
+
+    async def stop(self) -> None:
+        # let already queued rows land before shutting down
+        await self._queue.join()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def put(self, row: tuple[Any, ...]) -> bool:
+        fut: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        await self._queue.put((row, fut))
+        return await fut
+
+    async def _drain(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            try:
+                results = await self._write([row for row, _ in batch])
+            except Exception as e:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for (_, fut), created in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(created)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _write(self, rows: list[tuple[Any, ...]]) -> list[bool]:
+        try:
+            if len(rows) == 1:
+                # common case at low load: rowcount answers created/duplicate directly
+                cur = await self.conn.execute(INSERT_MESSAGE_SQL, rows[0])
+                await self.conn.commit()
+                return [cur.rowcount == 1]
+
+            ids = [row[0] for row in rows]
+            # IMMEDIATE takes the write lock up front, so the existence check below
+            # and the insert agree even if another process writes to the same file.
+            await self.conn.execute("BEGIN IMMEDIATE;")
+            cur = await self.conn.execute(EXISTING_IDS_SQL, (orjson.dumps(ids).decode("utf-8"),))
+            seen = {r["message_id"] for r in await cur.fetchall()}
+            # executemany discards RETURNING rows, hence the lookup above
+            await self.conn.executemany(INSERT_MESSAGE_SQL, rows)
+            await self.conn.commit()
+        except Exception:
+            await self.conn.rollback()
+            raise
+
+        # first occurrence of an id wins, later ones (also within the batch) are duplicates
+        results = []
+        for message_id in ids:
+            results.append(message_id not in seen)
+            seen.add(message_id)
+        return results
+
+
 async def insert_message(
-    conn: aiosqlite.Connection,
+    writer: InsertQueue,
     *,
     message_id: str,
     from_msisdn: str,
@@ -45,15 +170,21 @@ async def insert_message(
     """
     Returns True if created, False if duplicate (idempotent).
     """
-    cur = await conn.execute(
-        """
-        INSERT OR IGNORE INTO messages(message_id, from_msisdn, to_msisdn, ts, text, created_at)
-        VALUES(?,?,?,?,?,?)
-        """,
-        (message_id, from_msisdn, to_msisdn, ts, text, created_at),
-    )
-    await conn.commit()
-    return cur.rowcount == 1
+    return await writer.put((message_id, from_msisdn, to_msisdn, ts, text, created_at))
+
+
+# trigram needs at least 3 characters to match anything
+FTS_MIN_QUERY_LEN = 3
+
+
+def _fts_phrase(q: str) -> str:
+    # quote as a single FTS5 string so operators/punctuation in q are literal
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _like_literal(q: str) -> str:
+    # match q literally (like the FTS path does): escape LIKE wildcards
+    return q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 def _normalize_from_query(v: str) -> str:
@@ -65,6 +196,45 @@ def _normalize_from_query(v: str) -> str:
     return s
 
 
+_FROM_SQL = "from_msisdn = ?"
+_SINCE_SQL = "ts >= ?"
+_Q_SQL = {
+    "fts": "rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)",
+    "like": "text IS NOT NULL AND lower(text) LIKE '%' || lower(?) || '%' ESCAPE '\\'",
+}
+
+
+def _build_list_sql(has_from: bool, has_since: bool, q_mode: Optional[str]) -> tuple[str, str]:
+    where = []
+    if has_from:
+        where.append(_FROM_SQL)
+    if has_since:
+        where.append(_SINCE_SQL)
+    if q_mode:
+        where.append(_Q_SQL[q_mode])
+
+    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    count_sql = f"SELECT COUNT(*) AS c FROM messages{where_sql}"
+    page_sql = f"""
+        SELECT message_id, from_msisdn, to_msisdn, ts, text
+        FROM messages
+        {where_sql}
+        ORDER BY ts ASC, message_id ASC
+        LIMIT ? OFFSET ?
+        """
+    return count_sql, page_sql
+
+
+# (has_from, has_since, q_mode) -> (count_sql, page_sql). Built once so every call
+# passes an identical string and hits sqlite3's prepared-statement cache.
+LIST_SQL = {
+    (has_from, has_since, q_mode): _build_list_sql(has_from, has_since, q_mode)
+    for has_from in (False, True)
+    for has_since in (False, True)
+    for q_mode in (None, "fts", "like")
+}
+
+
 async def list_messages(
     conn: aiosqlite.Connection,
     *,
@@ -73,40 +243,33 @@ async def list_messages(
     from_filter: Optional[str],
     since: Optional[str],
     q: Optional[str],
+    fts: bool = False,
 ) -> tuple[list[dict[str, Any]], int]:
-    where = []
     args: list[Any] = []
+    q_mode = None
 
     if from_filter:
-        from_filter = _normalize_from_query(from_filter)
-        where.append("from_msisdn = ?")
-        args.append(from_filter)
+        args.append(_normalize_from_query(from_filter))
 
     if since:
-        where.append("ts >= ?")
         args.append(since)
 
     if q:
-        where.append("text IS NOT NULL AND lower(text) LIKE '%' || lower(?) || '%'")
-        args.append(q)
+        if fts and len(q) >= FTS_MIN_QUERY_LEN:
+            q_mode = "fts"
+            args.append(_fts_phrase(q))
+        else:
+            q_mode = "like"
+            args.append(_like_literal(q))
 
-    where_sql = (" WHERE " + " AND ".join(where)) if where else ""
+    count_sql, page_sql = LIST_SQL[(bool(from_filter), bool(since), q_mode)]
 
     # total
-    cur = await conn.execute(f"SELECT COUNT(*) AS c FROM messages{where_sql}", args)
+    cur = await conn.execute(count_sql, args)
     total = int((await cur.fetchone())["c"])
 
     # page
-    cur = await conn.execute(
-        f"""
-        SELECT message_id, from_msisdn, to_msisdn, ts, text
-        FROM messages
-        {where_sql}
-        ORDER BY ts ASC, message_id ASC
-        LIMIT ? OFFSET ?
-        """,
-        args + [limit, offset],
-    )
+    cur = await conn.execute(page_sql, args + [limit, offset])
     rows = await cur.fetchall()
 
     data = []
@@ -124,11 +287,21 @@ async def list_messages(
 
 
 async def compute_stats(conn: aiosqlite.Connection) -> dict[str, Any]:
-    cur = await conn.execute("SELECT COUNT(*) AS c FROM messages;")
-    total_messages = int((await cur.fetchone())["c"])
-
-    cur = await conn.execute("SELECT COUNT(DISTINCT from_msisdn) AS c FROM messages;")
-    senders_count = int((await cur.fetchone())["c"])
+    # totals come from the trigger-maintained summary row (O(1))
+    cur = await conn.execute(
+        "SELECT total_messages, senders_count, first_ts, last_ts FROM stats_summary WHERE id = 1;"
+    )
+    summary = await cur.fetchone()
+    if summary is None:
+        # summary row missing (e.g. deleted by hand): aggregate directly
+        cur = await conn.execute(
+            """
+            SELECT COUNT(*) AS total_messages, COUNT(DISTINCT from_msisdn) AS senders_count,
+                   MIN(ts) AS first_ts, MAX(ts) AS last_ts
+            FROM messages;
+            """
+        )
+        summary = await cur.fetchone()
 
     cur = await conn.execute(
         """
@@ -142,16 +315,10 @@ async def compute_stats(conn: aiosqlite.Connection) -> dict[str, Any]:
     top = await cur.fetchall()
     messages_per_sender = [{"from": r["sender"], "count": int(r["c"])} for r in top]
 
-    cur = await conn.execute("SELECT MIN(ts) AS min_ts, MAX(ts) AS max_ts FROM messages;")
-    row = await cur.fetchone()
-
-    first_ts = row["min_ts"]
-    last_ts = row["max_ts"]
-
     return {
-        "total_messages": total_messages,
-        "senders_count": senders_count,
+        "total_messages": int(summary["total_messages"]),
+        "senders_count": int(summary["senders_count"]),
         "messages_per_sender": messages_per_sender,
-        "first_message_ts": first_ts,
-        "last_message_ts": last_ts,
-    }
\ No newline at end of file
+        "first_message_ts": summary["first_ts"],
+        "last_message_ts": summary["last_ts"],
+    }
@@ -0,0 +1,5 @@
+import os
+
+# app.main builds a module-level app at import time, which needs these set.
+os.environ.setdefault("DATABASE_URL", "sqlite:///./test.db")
+os.environ.setdefault("WEBHOOK_SECRET", "testsecret")
@@ -0,0 +1,20 @@
+import io, json
+import pytest
+from app.logging_utils import build_logger, log_json
+
+def test_json_logger_writes_one_line_per_record_at_or_above_level():
+    stream = io.BytesIO()
+    logger = build_logger("warning", stream)
+
+    log_json(logger, 20, {"level":"INFO", "path":"/health/live"})
+    log_json(logger, 30, {"level":"WARNING", "path":"/nope", "text":"é"})
+    log_json(logger, 40, {"level":"ERROR", "path":"/webhook"})
+
+    lines = stream.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(l)["level"] for l in lines] == ["WARNING", "ERROR"]
+    assert json.loads(lines[0])["text"] == "é"
+    assert stream.getvalue().endswith(b"\n")
+
+def test_build_logger_rejects_unknown_level():
+    with pytest.raises(ValueError):
+        build_logger("verbose", io.BytesIO())
@@ -1,31 +1,64 @@
-import hmac, hashlib, json
-import pytest
-from httpx import AsyncClient
+import hmac, hashlib, json, sqlite3
+from fastapi.testclient import TestClient
 from app.main import create_app
 from app.config import Settings
 
 def sign(secret: str, body: bytes) -> str:
     return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
 
-async def post(ac, secret, payload):
+def post(ac, secret, payload):
     body = json.dumps(payload, separators=(",", ":")).encode()
-    return await ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign(secret, body)})
+    return ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign(secret, body)})
 
-@pytest.mark.asyncio
-async def test_stats(tmp_path):
+def test_stats(tmp_path):
     db = tmp_path / "app.db"
     secret = "testsecret"
     settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET=secret, LOG_LEVEL="INFO")
     app = create_app(settings)
 
-    async with AsyncClient(app=app, base_url="http://test") as ac:
-        await post(ac, secret, {"message_id":"m1","from":"+111","to":"+999","ts":"2025-01-10T09:00:00Z","text":"A"})
-        await post(ac, secret, {"message_id":"m2","from":"+111","to":"+999","ts":"2025-01-11T09:00:00Z","text":"B"})
-        await post(ac, secret, {"message_id":"m3","from":"+222","to":"+999","ts":"2025-01-15T10:00:00Z","text":"C"})
+    with TestClient(app) as ac:
+        post(ac, secret, {"message_id":"m1","from":"+111","to":"+999","ts":"2025-01-10T09:00:00Z","text":"A"})
+        post(ac, secret, {"message_id":"m2","from":"+111","to":"+999","ts":"2025-01-11T09:00:00Z","text":"B"})
+        post(ac, secret, {"message_id":"m3","from":"+222","to":"+999","ts":"2025-01-15T10:00:00Z","text":"C"})
 
-        r = await ac.get("/stats")
+        r = ac.get("/stats")
         j = r.json()
         assert j["total_messages"] == 3
         assert j["senders_count"] == 2
         assert j["first_message_ts"] == "2025-01-10T09:00:00Z"
-        assert j["last_message_ts"] == "2025-01-15T10:00:00Z"
\ No newline at end of file
+        assert j["last_message_ts"] == "2025-01-15T10:00:00Z"
+
+def test_stats_on_database_created_before_summary_table(tmp_path):
+    db = tmp_path / "app.db"
+    # messages table as created before stats_summary existed, with rows in it
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE messages (message_id TEXT PRIMARY KEY, from_msisdn TEXT NOT NULL, to_msisdn TEXT NOT NULL, ts TEXT NOT NULL, text TEXT, created_at TEXT NOT NULL)")
+    conn.execute("INSERT INTO messages VALUES ('m1','+111','+999','2025-01-10T09:00:00Z','A','x')")
+    conn.execute("INSERT INTO messages VALUES ('m2','+222','+999','2025-01-12T09:00:00Z','B','x')")
+    conn.commit()
+    conn.close()
+
+    secret = "testsecret"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET=secret, LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    with TestClient(app) as ac:
+        j = ac.get("/stats").json()
+        assert j["total_messages"] == 2
+        assert j["senders_count"] == 2
+        assert j["first_message_ts"] == "2025-01-10T09:00:00Z"
+        assert j["last_message_ts"] == "2025-01-12T09:00:00Z"
+
+        # later inserts keep updating the seeded summary
+        post(ac, secret, {"message_id":"m3","from":"+111","to":"+999","ts":"2025-01-15T10:00:00Z","text":"C"})
+        j = ac.get("/stats").json()
+        assert j["total_messages"] == 3
+        assert j["senders_count"] == 2
+        assert j["last_message_ts"] == "2025-01-15T10:00:00Z"
+
+        # a missing summary row falls back to aggregating messages
+        conn = sqlite3.connect(db)
+        conn.execute("DELETE FROM stats_summary;")
+        conn.commit()
+        conn.close()
+        assert ac.get("/stats").json()["total_messages"] == 3
@@ -0,0 +1,119 @@
+import asyncio
+import sqlite3
+import pytest
+from app.storage import InsertQueue, connect, init_db, init_fts, insert_message, list_messages
+
+# messages table as created before indexes/FTS/stats_summary existed
+BASELINE_SCHEMA_SQL = """
+CREATE TABLE messages (
+  message_id TEXT PRIMARY KEY,
+  from_msisdn TEXT NOT NULL,
+  to_msisdn TEXT NOT NULL,
+  ts TEXT NOT NULL,
+  text TEXT,
+  created_at TEXT NOT NULL
+);
+"""
+
+ROW = dict(from_msisdn="+100", to_msisdn="+200", ts="2025-01-15T10:00:00Z", text="Hi", created_at="2025-01-15T10:00:01Z")
+
+async def open_db(tmp_path):
+    conn = await connect(str(tmp_path / "app.db"))
+    await init_db(conn)
+    return conn
+
+async def queue_then_start(writer, coros):
+    # queue everything before the drain task runs so it all lands in one batch
+    tasks = [asyncio.create_task(c) for c in coros]
+    await asyncio.sleep(0)
+    writer.start()
+    return tasks
+
+@pytest.mark.asyncio
+async def test_insert_queue_duplicate_in_same_batch(tmp_path):
+    conn = await open_db(tmp_path)
+    writer = InsertQueue(conn)
+    tasks = await queue_then_start(writer, [insert_message(writer, message_id="m1", **ROW) for _ in range(2)])
+
+    assert await asyncio.gather(*tasks) == [True, False]
+    # and against an already stored row, alone and within a batch
+    assert await insert_message(writer, message_id="m1", **ROW) is False
+    await writer.stop()
+
+    writer = InsertQueue(conn)
+    tasks = await queue_then_start(writer, [insert_message(writer, message_id=m, **ROW) for m in ("m1", "m2")])
+    assert await asyncio.gather(*tasks) == [False, True]
+
+    await writer.stop()
+    await conn.close()
+
+@pytest.mark.asyncio
+async def test_insert_queue_failed_batch_reaches_every_caller(tmp_path):
+    conn = await open_db(tmp_path)
+    writer = InsertQueue(conn)
+    good = ("m1", "+100", "+200", "2025-01-15T10:00:00Z", "Hi", "2025-01-15T10:00:01Z")
+    bad = good[:5]  # wrong number of bindings
+    tasks = await queue_then_start(writer, [writer.put(good), writer.put(bad)])
+
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, sqlite3.ProgrammingError) for r in results)
+
+    # the batch was rolled back and the writer keeps serving
+    cur = await conn.execute("SELECT COUNT(*) AS c FROM messages;")
+    assert (await cur.fetchone())["c"] == 0
+    assert await insert_message(writer, message_id="m2", **ROW) is True
+
+    await writer.stop()
+    await conn.close()
+
+@pytest.mark.asyncio
+async def test_insert_queue_stop_drains_before_close(tmp_path):
+    conn = await open_db(tmp_path)
+    writer = InsertQueue(conn, max_batch=2)
+    tasks = await queue_then_start(writer, [insert_message(writer, message_id=f"m{i}", **ROW) for i in range(5)])
+
+    await writer.stop()
+    assert all(t.done() and t.result() is True for t in tasks)
+    await conn.close()
+
+    conn = await connect(str(tmp_path / "app.db"))
+    cur = await conn.execute("SELECT COUNT(*) AS c FROM messages;")
+    assert (await cur.fetchone())["c"] == 5
+    await conn.close()
+
+async def search(conn, q, fts):
+    data, total = await list_messages(conn, limit=100, offset=0, from_filter=None, since=None, q=q, fts=fts)
+    return sorted(r["message_id"] for r in data)
+
+@pytest.mark.asyncio
+async def test_q_is_a_literal_substring_on_both_paths(tmp_path):
+    conn = await open_db(tmp_path)
+    assert await init_fts(conn) is True
+    writer = InsertQueue(conn)
+    writer.start()
+    for mid, text in [("m1", "Hello World"), ("m2", "50% off_now"), ("m3", "5000 offXnow"), ("m4", None)]:
+        await insert_message(writer, message_id=mid, **{**ROW, "text": text})
+    await writer.stop()
+
+    for fts in (True, False):
+        # 3+ chars: FTS trigram when available, case-insensitive substring
+        assert await search(conn, "LO WO", fts) == ["m1"]
+        assert await search(conn, "0% off_", fts) == ["m2"]
+        # short queries always use LIKE; wildcards must stay literal
+        assert await search(conn, "%", fts) == ["m2"]
+        assert await search(conn, "f_", fts) == ["m2"]
+        assert await search(conn, "lo", fts) == ["m1"]
+    await conn.close()
+
+@pytest.mark.asyncio
+async def test_init_fts_backfills_existing_rows(tmp_path):
+    db = sqlite3.connect(tmp_path / "app.db")
+    db.executescript(BASELINE_SCHEMA_SQL)
+    db.execute("INSERT INTO messages VALUES ('m1','+100','+200','2025-01-15T10:00:00Z','Hello World','x')")
+    db.commit()
+    db.close()
+
+    conn = await open_db(tmp_path)
+    assert await init_fts(conn) is True
+    assert await search(conn, "world", True) == ["m1"]
+    await conn.close()
@@ -1,14 +1,12 @@
-import hmac, hashlib, json
-import pytest
-from httpx import AsyncClient
+import hmac, hashlib, json, os
+from fastapi.testclient import TestClient
 from app.main import create_app
 from app.config import Settings
 
 def sign(secret: str, body: bytes) -> str:
     return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
 
-@pytest.mark.asyncio
-async def test_webhook_valid_and_duplicate(tmp_path):
+def test_webhook_valid_and_duplicate(tmp_path):
     db = tmp_path / "app.db"
     settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
     app = create_app(settings)
@@ -21,16 +19,144 @@ async def test_webhook_valid_and_duplicate(tmp_path):
         "text":"Hello"
     }, separators=(",", ":")).encode()
 
-    async with AsyncClient(app=app, base_url="http://test") as ac:
+    with TestClient(app) as ac:
         # invalid signature
-        r = await ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":"123"})
+        r = ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":"123"})
         assert r.status_code == 401
 
         # valid signature, created
-        r = await ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+        r = ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
         assert r.status_code == 200
         assert r.json()["status"] == "ok"
 
         # duplicate, still 200
-        r = await ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
-        assert r.status_code == 200
\ No newline at end of file
+        r = ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+        assert r.status_code == 200
+
+def test_webhook_oversized_body(tmp_path):
+    db = tmp_path / "app.db"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    body = json.dumps({
+        "message_id":"m1",
+        "from":"+919876543210",
+        "to":"+14155550100",
+        "ts":"2025-01-15T10:00:00Z",
+        "text":"x" * 70000
+    }, separators=(",", ":")).encode()
+    headers = {"Content-Type":"application/json", "X-Signature":sign("testsecret", body)}
+
+    with TestClient(app) as ac:
+        # declared Content-Length: rejected before the body is read
+        r = ac.post("/webhook", content=body, headers=headers)
+        assert r.status_code == 413
+
+        # no Content-Length (chunked): rejected while streaming
+        chunks = (body[i:i + 8192] for i in range(0, len(body), 8192))
+        r = ac.post("/webhook", content=chunks, headers=headers)
+        assert "content-length" not in r.request.headers
+        assert r.status_code == 413
+
+        assert 'webhook_requests_total{result="payload_too_large"} 2.0' in ac.get("/metrics").text
+
+def test_webhook_max_length_non_ascii_text(tmp_path):
+    db = tmp_path / "app.db"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    payload = {"from":"+919876543210", "to":"+14155550100", "ts":"2025-01-15T10:00:00Z"}
+    bodies = [
+        # \u00e9 escapes (json.dumps default)
+        json.dumps({"message_id":"m1", **payload, "text":"\u00e9" * 4096}).encode(),
+        # \ud83d\ude00 surrogate pairs, the largest escaped form
+        json.dumps({"message_id":"m2", **payload, "text":"\U0001F600" * 4096}).encode(),
+        # raw UTF-8
+        json.dumps({"message_id":"m3", **payload, "text":"\U0001F600" * 4096}, ensure_ascii=False).encode(),
+    ]
+
+    with TestClient(app) as ac:
+        for body in bodies:
+            r = ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+            assert r.status_code == 200
+
+def test_webhook_validation_errors_name_the_field(tmp_path):
+    db = tmp_path / "app.db"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    def post(payload):
+        body = json.dumps(payload, separators=(",", ":")).encode()
+        return ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+
+    with TestClient(app) as ac:
+        r = post({"message_id":"m1","from":"123","to":"+14155550100","ts":"2025-01-15T10:00:00"})
+        assert r.status_code == 422
+        assert [e["loc"] for e in r.json()["detail"]] == [["body","from"], ["body","ts"]]
+
+        r = post({"message_id":"m1","from":"+919876543210","ts":"2025-01-15T10:00:00Z"})
+        assert r.status_code == 422
+        assert [e["loc"] for e in r.json()["detail"]] == [["body","to"]]
+
+        r = post({"message_id":"m1","from":"+919876543210","to":"+14155550100","ts":"2025-01-15T10:00:00Z","text":5})
+        assert r.status_code == 422
+        assert [e["loc"] for e in r.json()["detail"]] == [["body","text"]]
+
+        # valid JSON that orjson can't re-parse (1e999 in an ignored field) is still a 422
+        body = b'{"message_id":"m1","from":"+1","to":"+2","ts":"x","y":1e999}'
+        r = ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+        assert r.status_code == 422
+        assert [e["loc"] for e in r.json()["detail"]] == [["body","ts"]]
+
+        schema = ac.get("/openapi.json").json()["paths"]["/webhook"]["post"]
+        assert schema["requestBody"]["required"] is True
+        assert schema["requestBody"]["content"]["application/json"]["schema"]["required"] == ["message_id","from","to","ts"]
+
+        # date-only timestamps are still accepted and canonicalized
+        r = post({"message_id":"m2","from":"+919876543210","to":"+14155550100","ts":"2025-01-15Z"})
+        assert r.status_code == 200
+        assert ac.get("/messages").json()["data"][0]["ts"] == "2025-01-15T00:00:00Z"
+
+def test_request_id_header(tmp_path):
+    db = tmp_path / "app.db"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    with TestClient(app) as ac:
+        # inbound id is echoed back
+        r = ac.get("/health/live", headers={"X-Request-ID":"abc-123"})
+        assert r.headers["X-Request-ID"] == "abc-123"
+
+        # oversized inbound id (over 128 bytes) is replaced
+        r = ac.get("/health/live", headers={"X-Request-ID":"x" * 129})
+        assert r.headers["X-Request-ID"] != "x" * 129
+
+        # otherwise a distinct "<pid>-<n>" id (hex) per request
+        ids = [ac.get("/health/live").headers["X-Request-ID"] for _ in range(2)]
+        assert ids[0] != ids[1]
+        for rid in ids:
+            pid, n = rid.split("-")
+            assert int(pid, 16) == os.getpid()
+            int(n, 16)
+
+def test_webhook_e164_and_ts_boundaries(tmp_path):
+    db = tmp_path / "app.db"
+    settings = Settings(DATABASE_URL=f"sqlite:////{db}", WEBHOOK_SECRET="testsecret", LOG_LEVEL="INFO")
+    app = create_app(settings)
+
+    def post(message_id, frm, ts="2025-01-15T10:00:00Z"):
+        body = json.dumps({"message_id":message_id, "from":frm, "to":"+14155550100", "ts":ts}).encode()
+        return ac.post("/webhook", content=body, headers={"Content-Type":"application/json", "X-Signature":sign("testsecret", body)})
+
+    with TestClient(app) as ac:
+        # E.164 allows at most 15 digits
+        assert post("m1", "+" + "1" * 15).status_code == 200
+        assert post("m2", "+" + "1" * 16).status_code == 422
+        assert post("m3", "+").status_code == 422
+        # non-ASCII digits (Arabic-Indic one, two)
+        assert post("m4", "+١٢").status_code == 422
+
+        # canonical-looking ts with an invalid month is rejected on the fast path
+        r = post("m5", "+14155550100", ts="2025-13-01T00:00:00Z")
+        assert r.status_code == 422
+        assert [e["loc"] for e in r.json()["detail"]] == [["body","ts"]]